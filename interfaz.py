@@ -1,13 +1,11 @@
-import json
 import os
-import datetime
-from pathlib import Path
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog, scrolledtext
+from tkinter import ttk, messagebox, simpledialog, scrolledtext, filedialog
+from logica import FatFileSystem, formatearReporte
 
 class FatFileSystemGUI:
     def __init__(self, root):
-        self.fs = FatFileSystem()
+        self.fs = FatFileSystem(archivoGrabacion=os.environ.get("FAT_GRABACION"))
         self.root = root
         self.root.title("Sistema de Archivos FAT")
         self.root.geometry("800x600")
@@ -45,6 +43,12 @@ class FatFileSystemGUI:
             ("Recuperar Archivo", self.recuperar_archivo),
             ("Gestionar Permisos", self.gestionar_permisos),
             ("Cambiar Usuario", self.cambiar_usuario),
+            ("Verificar Integridad", self.verificar_integridad),
+            ("Clonar Archivo", self.clonar_archivo),
+            ("Snapshots", self.gestionar_snapshots),
+            ("Importar Archivo", self.importar_archivo),
+            ("Exportar Archivo", self.exportar_archivo),
+            ("Importar Directorio", self.importar_directorio),
             ("Salir", self.salir)
         ]
         
@@ -82,26 +86,7 @@ class FatFileSystemGUI:
         if contenido is None:
             return
         
-        baseName = nombre.replace(" ", "_").lower()
-        dataBlocks = self.fs.crearDataBlocks(contenido, baseName)
-        
-        fileEntry = {
-            "nombreArchivo": nombre,
-            "archivoDatosInicial": dataBlocks[0] if dataBlocks else "",
-            "enPapelera": False,
-            "totalCaracteres": len(contenido),
-            "fechaCreacion": datetime.datetime.now(),
-            "fechaModificacion": datetime.datetime.now(),
-            "fechaEliminacion": None,
-            "owner": self.fs.currentUser,
-            "permisos": {
-                "lectura": [self.fs.currentUser],
-                "escritura": [self.fs.currentUser]
-            }
-        }
-        
-        self.fs.fatTable.append(fileEntry)
-        self.fs.guardarTablaFat()
+        self.fs.crearEntrada(nombre, contenido)
         self.mostrar_mensaje("ÉXITO", f"Archivo '{nombre}' creado exitosamente.")
         self.update_status()
     
@@ -138,6 +123,12 @@ Permisos:
                     messagebox.showerror("Error", "No tiene permisos de lectura para este archivo.")
                     return
                 
+                try:
+                    contenido_archivo = self.fs.contenidoVisible(fileEntry)
+                except ValueError as e:
+                    messagebox.showerror("Error", str(e))
+                    return
+                
                 self.limpiar_texto()
                 contenido = f"""=== METADATOS DE '{nombre}' ===
 Propietario: {fileEntry['owner']}
@@ -146,7 +137,7 @@ Creado: {fileEntry['fechaCreacion']}
 Modificado: {fileEntry['fechaModificacion']}
 
 === CONTENIDO ===
-{self.fs.leerContenido(fileEntry)}"""
+{contenido_archivo}"""
                 self.mostrar_mensaje("", contenido)
                 return
         
@@ -157,13 +148,18 @@ Modificado: {fileEntry['fechaModificacion']}
         if not nombre:
             return
         
-        for i, fileEntry in enumerate(self.fs.fatTable):
+        for fileEntry in self.fs.fatTable:
             if fileEntry["nombreArchivo"] == nombre and not fileEntry["enPapelera"]:
                 if self.fs.currentUser not in fileEntry["permisos"]["escritura"] and self.fs.currentUser != fileEntry["owner"]:
                     messagebox.showerror("Error", "No tiene permisos de escritura para este archivo.")
                     return
                 
-                contenido_actual = self.fs.leerContenido(fileEntry)
+                try:
+                    contenido_actual = self.fs.contenidoVisible(fileEntry)
+                except ValueError as e:
+                    messagebox.showerror("Error", str(e))
+                    return
+                
                 nuevo_contenido = simpledialog.askstring(
                     "Modificar Archivo", 
                     f"Contenido actual:\n{contenido_actual}\n\nIngrese el nuevo contenido:"
@@ -172,15 +168,7 @@ Modificado: {fileEntry['fechaModificacion']}
                 if nuevo_contenido is None:
                     return
                 
-                self.fs.borrarBloquesViejos(fileEntry["archivoDatosInicial"])
-                baseName = nombre.replace(" ", "_").lower()
-                dataBlocks = self.fs.crearDataBlocks(nuevo_contenido, baseName)
-                
-                self.fs.fatTable[i]["archivoDatosInicial"] = dataBlocks[0] if dataBlocks else ""
-                self.fs.fatTable[i]["totalCaracteres"] = len(nuevo_contenido)
-                self.fs.fatTable[i]["fechaModificacion"] = datetime.datetime.now()
-                
-                self.fs.guardarTablaFat()
+                self.fs.reescribirEntrada(nombre, nuevo_contenido)
                 self.mostrar_mensaje("ÉXITO", f"Archivo '{nombre}' modificado exitosamente.")
                 return
         
@@ -191,15 +179,13 @@ Modificado: {fileEntry['fechaModificacion']}
         if not nombre:
             return
         
-        for i, fileEntry in enumerate(self.fs.fatTable):
+        for fileEntry in self.fs.fatTable:
             if fileEntry["nombreArchivo"] == nombre and not fileEntry["enPapelera"]:
                 if self.fs.currentUser != fileEntry["owner"]:
                     messagebox.showerror("Error", "Solo el propietario puede eliminar el archivo.")
                     return
                 
-                self.fs.fatTable[i]["enPapelera"] = True
-                self.fs.fatTable[i]["fechaEliminacion"] = datetime.datetime.now()
-                self.fs.guardarTablaFat()
+                self.fs.moverAPapelera(nombre)
                 self.mostrar_mensaje("ÉXITO", f"Archivo '{nombre}' movido a la papelera de reciclaje.")
                 self.update_status()
                 return
@@ -229,15 +215,13 @@ Tamaño: {fileEntry['totalCaracteres']} caracteres
         if not nombre:
             return
         
-        for i, fileEntry in enumerate(self.fs.fatTable):
+        for fileEntry in self.fs.fatTable:
             if fileEntry["nombreArchivo"] == nombre and fileEntry["enPapelera"]:
                 if self.fs.currentUser != fileEntry["owner"]:
                     messagebox.showerror("Error", "Solo el propietario puede recuperar el archivo.")
                     return
                 
-                self.fs.fatTable[i]["enPapelera"] = False
-                self.fs.fatTable[i]["fechaEliminacion"] = None
-                self.fs.guardarTablaFat()
+                self.fs.sacarDePapelera(nombre)
                 self.mostrar_mensaje("ÉXITO", f"Archivo '{nombre}' recuperado de la papelera.")
                 self.update_status()
                 return
@@ -257,7 +241,7 @@ Tamaño: {fileEntry['totalCaracteres']} caracteres
         if not usuario:
             return
         
-        for i, fileEntry in enumerate(self.fs.fatTable):
+        for fileEntry in self.fs.fatTable:
             if fileEntry["nombreArchivo"] == nombre and not fileEntry["enPapelera"]:
                 opcion = simpledialog.askstring(
                     "Gestionar Permisos",
@@ -269,18 +253,17 @@ Tamaño: {fileEntry['totalCaracteres']} caracteres
                 )
                 
                 if opcion == "1" and usuario not in fileEntry["permisos"]["lectura"]:
-                    self.fs.fatTable[i]["permisos"]["lectura"].append(usuario)
+                    self.fs.cambiarPermiso(nombre, usuario, "lectura", True)
                 elif opcion == "2" and usuario in fileEntry["permisos"]["lectura"]:
-                    self.fs.fatTable[i]["permisos"]["lectura"].remove(usuario)
+                    self.fs.cambiarPermiso(nombre, usuario, "lectura", False)
                 elif opcion == "3" and usuario not in fileEntry["permisos"]["escritura"]:
-                    self.fs.fatTable[i]["permisos"]["escritura"].append(usuario)
+                    self.fs.cambiarPermiso(nombre, usuario, "escritura", True)
                 elif opcion == "4" and usuario in fileEntry["permisos"]["escritura"]:
-                    self.fs.fatTable[i]["permisos"]["escritura"].remove(usuario)
+                    self.fs.cambiarPermiso(nombre, usuario, "escritura", False)
                 else:
                     messagebox.showerror("Error", "Opción inválida o no aplicable.")
                     return
                 
-                self.fs.guardarTablaFat()
                 self.mostrar_mensaje("ÉXITO", "Permisos actualizados exitosamente.")
                 return
         
@@ -293,101 +276,163 @@ Tamaño: {fileEntry['totalCaracteres']} caracteres
             self.mostrar_mensaje("ÉXITO", f"Usuario cambiado a: {self.fs.currentUser}")
             self.update_status()
     
-    def salir(self):
-        if messagebox.askokcancel("Salir", "¿Está seguro de que desea salir?"):
-            self.root.destroy()
-
-# Mantener la clase FatFileSystem original sin cambios
-class FatFileSystem:
-    def __init__(self):
-        self.fatTable = []
-        self.currentUser = "admin"
-        self.dataDirectory = "data_blocks"
-        self.fatTableFile = "fat_table.json"
-        self.cargarTablaFat()
-        Path(self.dataDirectory).mkdir(exist_ok=True)
-    
-    def cargarTablaFat(self):
-        try:
-            if os.path.exists(self.fatTableFile):
-                with open(self.fatTableFile, 'r') as file:
-                    self.fatTable = json.load(file)
-        except Exception as e:
-            print(f"Error al cargar la tabla FAT: {e}")
-            self.fatTable = []
+    def verificar_integridad(self):
+        reparar = messagebox.askyesno("Verificar Integridad", "¿Desea reparar los errores encontrados?")
+        reporte = self.fs.verificarIntegridad(reparar=reparar)
+        
+        self.limpiar_texto()
+        lineas = formatearReporte(reporte, reparar)
+        self.mostrar_mensaje("VERIFICACIÓN DE INTEGRIDAD", "\n".join(lineas))
+        self.update_status()
     
-    def guardarTablaFat(self):
-        try:
-            with open(self.fatTableFile, 'w') as file:
-                json.dump(self.fatTable, file, indent=2, default=str)
-        except Exception as e:
-            print(f"Error al guardar la tabla FAT: {e}")
+    def clonar_archivo(self):
+        nombre = simpledialog.askstring("Clonar Archivo", "Ingrese el nombre del archivo a clonar:")
+        if not nombre:
+            return
+        
+        nuevo_nombre = simpledialog.askstring("Clonar Archivo", "Ingrese el nombre del nuevo archivo:")
+        if not nuevo_nombre:
+            return
+        
+        for fileEntry in self.fs.fatTable:
+            if fileEntry["nombreArchivo"] == nuevo_nombre and not fileEntry["enPapelera"]:
+                messagebox.showerror("Error", "Ya existe un archivo con ese nombre.")
+                return
+        
+        for fileEntry in self.fs.fatTable:
+            if fileEntry["nombreArchivo"] == nombre and not fileEntry["enPapelera"]:
+                if self.fs.currentUser not in fileEntry["permisos"]["lectura"] and self.fs.currentUser != fileEntry["owner"]:
+                    messagebox.showerror("Error", "No tiene permisos de lectura para este archivo.")
+                    return
+                
+                self.fs.clonarEntrada(nombre, nuevo_nombre)
+                self.mostrar_mensaje("ÉXITO", f"Archivo '{nombre}' clonado como '{nuevo_nombre}'.")
+                self.update_status()
+                return
+        
+        messagebox.showerror("Error", "Archivo no encontrado o está en la papelera.")
     
-    def generarBloque(self, baseName, index):
-        return f"{self.dataDirectory}/{baseName}_block_{index}.json"
+    def gestionar_snapshots(self):
+        if self.fs.currentUser != "admin":
+            messagebox.showerror("Error", "Solo el administrador puede gestionar snapshots.")
+            return
+        
+        opcion = simpledialog.askstring(
+            "Snapshots",
+            "Seleccione una opción:\n\n"
+            "1. Crear snapshot\n"
+            "2. Listar snapshots\n"
+            "3. Restaurar snapshot\n"
+            "4. Eliminar snapshot"
+        )
+        
+        if opcion == "2":
+            self.limpiar_texto()
+            self.mostrar_mensaje("SNAPSHOTS", "")
+            for snapshot in self.fs.snapshots.values():
+                self.mostrar_mensaje("", f"Nombre: {snapshot['nombre']}\nFecha: {snapshot['fecha']}\nArchivos: {len(snapshot['fatTable'])}\n{'-'*40}")
+            if not self.fs.snapshots:
+                self.mostrar_mensaje("", "No hay snapshots.")
+            return
+        
+        if opcion not in ("1", "3", "4"):
+            messagebox.showerror("Error", "Opción inválida.")
+            return
+        
+        nombre = simpledialog.askstring("Snapshots", "Ingrese el nombre del snapshot:")
+        if not nombre:
+            return
+        
+        if opcion == "1":
+            if nombre in self.fs.snapshots:
+                messagebox.showerror("Error", "Ya existe un snapshot con ese nombre.")
+                return
+            try:
+                self.fs.crearSnapshot(nombre)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            self.mostrar_mensaje("ÉXITO", f"Snapshot '{nombre}' creado exitosamente.")
+        elif nombre not in self.fs.snapshots:
+            messagebox.showerror("Error", "Snapshot no encontrado.")
+            return
+        elif opcion == "3":
+            self.fs.restaurarSnapshot(nombre)
+            self.mostrar_mensaje("ÉXITO", f"Snapshot '{nombre}' restaurado exitosamente.")
+        else:
+            self.fs.eliminarSnapshot(nombre)
+            self.mostrar_mensaje("ÉXITO", f"Snapshot '{nombre}' eliminado exitosamente.")
+        
+        self.update_status()
     
-    def crearDataBlocks(self, content, baseName):
-        blocks = []
-        contentLength = len(content)
-        
-        for i in range(0, contentLength, 20):
-            blockContent = content[i:i+20]
-            blockFileName = self.generarBloque(baseName, len(blocks))
-            
-            blockData = {
-                "datos": blockContent,
-                "siguiente": self.generarBloque(baseName, len(blocks) + 1) if i + 20 < contentLength else "",
-                "eof": i + 20 >= contentLength
-            }
-            
-            with open(blockFileName, 'w') as blockFile:
-                json.dump(blockData, blockFile, indent=2)
-            
-            blocks.append(blockFileName)
-        
-        return blocks
+    def mostrar_progreso(self, nombre, procesados, total):
+        porcentaje = 100 if total == 0 else procesados * 100 // total
+        self.status_var.set(f"{nombre}: {procesados}/{total} ({porcentaje}%)")
+        self.root.update_idletasks()
     
-    def leerContenido(self, fileEntry):
-        if not fileEntry["archivoDatosInicial"]:
-            return ""
+    def importar_archivo(self):
+        ruta = filedialog.askopenfilename(title="Importar Archivo")
+        if not ruta:
+            return
         
-        content = ""
-        currentBlock = fileEntry["archivoDatosInicial"]
+        nombre = simpledialog.askstring("Importar Archivo", "Ingrese el nombre del archivo en el sistema:")
+        if not nombre:
+            return
         
-        while currentBlock:
-            try:
-                with open(currentBlock, 'r') as blockFile:
-                    blockData = json.load(blockFile)
+        try:
+            self.fs.importarArchivoHost(ruta, nombre, progreso=self.mostrar_progreso)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al importar el archivo: {e}")
+            self.update_status()
+            return
+        
+        self.mostrar_mensaje("ÉXITO", f"Archivo '{nombre}' importado exitosamente.")
+        self.update_status()
+    
+    def exportar_archivo(self):
+        nombre = simpledialog.askstring("Exportar Archivo", "Ingrese el nombre del archivo:")
+        if not nombre:
+            return
+        
+        for fileEntry in self.fs.fatTable:
+            if fileEntry["nombreArchivo"] == nombre and not fileEntry["enPapelera"]:
+                if self.fs.currentUser not in fileEntry["permisos"]["lectura"] and self.fs.currentUser != fileEntry["owner"]:
+                    messagebox.showerror("Error", "No tiene permisos de lectura para este archivo.")
+                    return
                 
-                content += blockData["datos"]
+                ruta = filedialog.asksaveasfilename(title="Exportar Archivo", initialfile=nombre)
+                if not ruta:
+                    return
                 
-                if blockData["eof"]:
-                    break
+                try:
+                    self.fs.exportarArchivoHost(nombre, ruta, progreso=self.mostrar_progreso)
+                except Exception as e:
+                    messagebox.showerror("Error", f"Error al exportar el archivo: {e}")
+                    self.update_status()
+                    return
                 
-                currentBlock = blockData["siguiente"]
-            except Exception as e:
-                print(f"Error al leer bloque {currentBlock}: {e}")
-                break
+                self.mostrar_mensaje("ÉXITO", f"Archivo '{nombre}' exportado a '{ruta}'.")
+                self.update_status()
+                return
         
-        return content
+        messagebox.showerror("Error", "Archivo no encontrado o está en la papelera.")
     
-    def borrarBloquesViejos(self, initialBlock):
-        currentBlock = initialBlock
+    def importar_directorio(self):
+        ruta = filedialog.askdirectory(title="Importar Directorio")
+        if not ruta:
+            return
         
-        while currentBlock:
-            try:
-                if os.path.exists(currentBlock):
-                    with open(currentBlock, 'r') as blockFile:
-                        blockData = json.load(blockFile)
-                    
-                    nextBlock = blockData["siguiente"]
-                    os.remove(currentBlock)
-                    currentBlock = nextBlock
-                else:
-                    break
-            except Exception as e:
-                print(f"Error al eliminar bloque {currentBlock}: {e}")
-                break
+        importados, errores = self.fs.importarDirectorio(ruta, progreso=self.mostrar_progreso)
+        
+        mensaje = f"Archivos importados: {len(importados)}"
+        if errores:
+            mensaje += "\n" + "\n".join(f"Error: {error}" for error in errores)
+        self.mostrar_mensaje("IMPORTAR DIRECTORIO", mensaje)
+        self.update_status()
+    
+    def salir(self):
+        if messagebox.askokcancel("Salir", "¿Está seguro de que desea salir?"):
+            self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,16 +1,223 @@
 import json
 import os
+import base64
+import collections
+import copy
 import datetime
+import functools
+import hashlib
+import inspect
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+
+def calcularChecksum(content):
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def leerDatosBloque(blockData):
+    # Devuelve los bytes del bloque y su tamaño (caracteres en texto, bytes en binario)
+    if blockData.get("codificacion") == "base64":
+        datos = base64.b64decode(blockData["datos"])
+        return datos, len(datos)
+    return blockData["datos"].encode("utf-8"), len(blockData["datos"])
+
+
+class GrabadorOperaciones:
+    def __init__(self, archivo):
+        self.lock = threading.Lock()
+        self.file = open(archivo, 'a', encoding="utf-8")
+    
+    def registrar(self, registro):
+        linea = json.dumps(registro, default=str)
+        with self.lock:
+            self.file.write(linea + "\n")
+            self.file.flush()
+
+
+operacionesRegistrables = set()
+
+
+def registrarOperacion(operacion):
+    # Las operaciones marcadas quedan en la traza del grabador y el reproductor puede volver a ejecutarlas
+    operacionesRegistrables.add(operacion.__name__)
+    firma = inspect.signature(operacion)
+    
+    @functools.wraps(operacion)
+    def wrapper(self, *args, **kwargs):
+        if not self.grabador:
+            return operacion(self, *args, **kwargs)
+        
+        llamada = firma.bind(self, *args, **kwargs)
+        argumentos = dict(llamada.arguments)
+        argumentos.pop("self")
+        argumentos.pop("progreso", None)
+        
+        # El tiempo que consume el callback de progreso (consola o GUI) no forma parte de la operacion
+        llamada.apply_defaults()
+        tiempoProgreso = [0.0]
+        progreso = llamada.arguments.get("progreso")
+        if progreso:
+            def progresoMedido(*datos):
+                inicioProgreso = time.perf_counter()
+                try:
+                    progreso(*datos)
+                finally:
+                    tiempoProgreso[0] += time.perf_counter() - inicioProgreso
+            llamada.arguments["progreso"] = progresoMedido
+        
+        registro = {
+            "timestamp": time.time(),
+            "operacion": operacion.__name__,
+            "usuario": self.currentUser,
+            "argumentos": argumentos
+        }
+        resultado = None
+        inicio = time.perf_counter()
+        
+        try:
+            resultado = operacion(*llamada.args, **llamada.kwargs)
+            return resultado
+        except Exception as e:
+            registro["error"] = str(e)
+            raise
+        finally:
+            registro["duracion"] = time.perf_counter() - inicio - tiempoProgreso[0]
+            if isinstance(resultado, (str, bytes)):
+                registro["tamano"] = len(resultado)
+            elif isinstance(resultado, int):
+                registro["tamano"] = resultado
+            elif isinstance(resultado, dict) and "totalCaracteres" in resultado:
+                registro["tamano"] = resultado["totalCaracteres"]
+            self.grabador.registrar(registro)
+    
+    return wrapper
+
+
+def imprimirProgreso(fileName, procesados, total):
+    porcentaje = 100 if total == 0 else procesados * 100 // total
+    print(f"\r{fileName}: {procesados}/{total} ({porcentaje}%)", end="" if procesados < total else "\n")
+
+
+def formatearReporte(reporte, reparar):
+    lineas = [f"Archivos revisados: {reporte['archivos']}", f"Bloques revisados: {reporte['bloques']}"]
+    lineas += [f"  {error}" for error in reporte["errores"]]
+    lineas += [f"  Bloque huérfano: {blockFileName}" for blockFileName in reporte["huerfanos"]]
+    
+    if not reporte["errores"] and not reporte["huerfanos"]:
+        lineas.append("No se encontraron problemas.")
+    elif reparar:
+        if reporte["cuarentena"]:
+            lineas.append(f"Bloques huérfanos movidos a: {reporte['cuarentena']}")
+        if reporte["sinReparar"]:
+            lineas.append("Reparación parcial. Quedaron sin reparar:")
+            lineas += [f"  {problema}" for problema in reporte["sinReparar"]]
+        else:
+            lineas.append("Reparación completada.")
+    
+    return lineas
+
+
+def verificarCadena(bloqueInicial):
+    # Recorre una cadena de bloques en un proceso aparte y devuelve lo encontrado
+    bloques = []
+    bloquesDanados = []
+    vistos = set()
+    errores = []
+    cortada = False
+    longitud = 0
+    checksumArchivo = hashlib.sha256()
+    currentBlock = bloqueInicial
+    
+    while currentBlock:
+        if currentBlock in vistos:
+            errores.append(f"Ciclo detectado en el bloque {currentBlock}")
+            cortada = True
+            break
+        vistos.add(currentBlock)
+        
+        if not os.path.exists(currentBlock):
+            errores.append(f"Enlace colgante: el bloque {currentBlock} no existe")
+            cortada = True
+            break
+        
+        try:
+            with open(currentBlock, 'r') as blockFile:
+                blockData = json.load(blockFile)
+            datos, tamano = leerDatosBloque(blockData)
+            eof = blockData["eof"]
+            nextBlock = blockData["siguiente"]
+        except Exception as e:
+            errores.append(f"Bloque corrupto {currentBlock}: {e}")
+            cortada = True
+            break
+        
+        # Un bloque con checksum inválido pero legible no corta la cadena, sus siguientes siguen siendo validos
+        if "checksum" in blockData and calcularChecksum(datos) != blockData["checksum"]:
+            errores.append(f"Checksum inválido en el bloque {currentBlock}")
+            bloquesDanados.append(currentBlock)
+        
+        bloques.append(currentBlock)
+        longitud += tamano
+        checksumArchivo.update(datos)
+        
+        if eof:
+            break
+        if not nextBlock:
+            errores.append(f"El bloque {currentBlock} no tiene siguiente ni marca de fin")
+            cortada = True
+            break
+        
+        currentBlock = nextBlock
+    
+    return {
+        "bloques": bloques,
+        "bloquesDanados": bloquesDanados,
+        "cortada": cortada,
+        "errores": errores,
+        "longitud": longitud,
+        "checksum": checksumArchivo.hexdigest()
+    }
+
+
 class FatFileSystem:
-    def __init__(self):
+    def __init__(self, directorioBase="", archivoGrabacion=None):
         self.fatTable = []
+        self.usuarioHilo = threading.local()
         self.currentUser = "admin"
-        self.dataDirectory = "data_blocks"
-        self.fatTableFile = "fat_table.json"
+        self.dataDirectory = os.path.join(directorioBase, "data_blocks")
+        self.fatTableFile = os.path.join(directorioBase, "fat_table.json")
+        self.snapshotDirectory = os.path.join(directorioBase, "snapshots")
+        self.quarantineDirectory = os.path.join(directorioBase, "cuarentena")
+        self.snapshots = {}
+        self.archivosSnapshot = {}
+        self.tamanoBloqueImportacion = 64 * 1024
+        self.lock = threading.RLock()
+        self.basesReservadas = set()
+        self.referencias = collections.Counter()
+        self.grabador = GrabadorOperaciones(archivoGrabacion) if archivoGrabacion else None
         self.cargarTablaFat()
         Path(self.dataDirectory).mkdir(exist_ok=True)
+        Path(self.snapshotDirectory).mkdir(exist_ok=True)
+        self.cargarSnapshots()
+        self.recalcularReferencias()
+    
+    @property
+    def currentUser(self):
+        # Un hilo puede actuar como otro usuario sin cambiar el del resto (ver asignarUsuarioHilo)
+        return getattr(self.usuarioHilo, "usuario", self.usuarioGlobal)
+    
+    @currentUser.setter
+    def currentUser(self, usuario):
+        self.usuarioGlobal = usuario
+    
+    def asignarUsuarioHilo(self, usuario):
+        self.usuarioHilo.usuario = usuario
     
     def cargarTablaFat(self):
         try:
@@ -23,14 +230,70 @@ class FatFileSystem:
     
     def guardarTablaFat(self):
         try:
-            with open(self.fatTableFile, 'w') as file:
+            with self.lock, open(self.fatTableFile, 'w') as file:
                 json.dump(self.fatTable, file, indent=2, default=str)
         except Exception as e:
             print(f"Error al guardar la tabla FAT: {e}")
     
+    def cargarSnapshots(self):
+        for snapshotFile in sorted(Path(self.snapshotDirectory).glob("*.json")):
+            try:
+                with open(snapshotFile, 'r') as file:
+                    snapshot = json.load(file)
+            except Exception as e:
+                print(f"Error al cargar el snapshot {snapshotFile}: {e}")
+                continue
+            
+            if snapshot["nombre"] in self.snapshots:
+                print(f"Error: el snapshot {snapshotFile} repite el nombre '{snapshot['nombre']}', se ignora.")
+                continue
+            self.snapshots[snapshot["nombre"]] = snapshot
+            self.archivosSnapshot[snapshot["nombre"]] = str(snapshotFile)
+    
+    def generarArchivoSnapshot(self, nombre):
+        # El nombre se guarda dentro del archivo; el hash evita choques y caracteres invalidos en la ruta
+        return f"{self.snapshotDirectory}/{hashlib.sha256(nombre.encode('utf-8')).hexdigest()}.json"
+    
+    def guardarSnapshot(self, snapshot):
+        snapshotFile = self.archivosSnapshot.get(snapshot["nombre"]) or self.generarArchivoSnapshot(snapshot["nombre"])
+        try:
+            with open(snapshotFile, 'w') as file:
+                json.dump(snapshot, file, indent=2, default=str)
+        except Exception as e:
+            raise ValueError(f"Error al guardar el snapshot '{snapshot['nombre']}': {e}") from e
+        self.archivosSnapshot[snapshot["nombre"]] = snapshotFile
+    
     def generarBloque(self, baseName, index):
         return f"{self.dataDirectory}/{baseName}_block_{index}.json"
     
+    def generarNombreBase(self, fileName):
+        # Las cadenas compartidas conservan sus bloques, asi que se busca un nombre libre
+        baseName = fileName.replace(" ", "_").replace("/", "_").replace("\\", "_").lower()
+        candidate = baseName
+        version = 1
+        
+        with self.lock:
+            while os.path.exists(self.generarBloque(candidate, 0)) or candidate in self.basesReservadas:
+                candidate = f"{baseName}_v{version}"
+                version += 1
+            self.basesReservadas.add(candidate)
+        
+        return candidate
+    
+    def liberarNombreBase(self, baseName):
+        with self.lock:
+            self.basesReservadas.discard(baseName)
+    
+    def recalcularReferencias(self):
+        # Cuantas entradas (de la FAT y de los snapshots) apuntan a cada cadena
+        with self.lock:
+            self.referencias = collections.Counter(fileEntry["archivoDatosInicial"] for fileEntry in self.fatTable)
+            for snapshot in self.snapshots.values():
+                self.referencias.update(fileEntry["archivoDatosInicial"] for fileEntry in snapshot["fatTable"])
+    
+    def contarReferencias(self, initialBlock):
+        return self.referencias[initialBlock]
+    
     def crearDataBlocks(self, content, baseName):
         blocks = []
         contentLength = len(content)
@@ -42,7 +305,8 @@ class FatFileSystem:
             blockData = {
                 "datos": blockContent,
                 "siguiente": self.generarBloque(baseName, len(blocks) + 1) if i + 20 < contentLength else "",
-                "eof": i + 20 >= contentLength
+                "eof": i + 20 >= contentLength,
+                "checksum": calcularChecksum(blockContent)
             }
             
             with open(blockFileName, 'w') as blockFile:
@@ -52,23 +316,24 @@ class FatFileSystem:
         
         return blocks
     
-    def crearArchivo(self):
-        fileName = input("Ingrese el nombre del archivo: ")
+    def buscarEntrada(self, fileName, enPapelera=False):
         for fileEntry in self.fatTable:
-            if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
-                print("Error: Ya existe un archivo con ese nombre.")
-                return
-        
-        content = input("Ingrese el contenido del archivo: ")
-        
-        baseName = fileName.replace(" ", "_").lower()
+            if fileEntry["nombreArchivo"] == fileName and fileEntry["enPapelera"] == enPapelera:
+                return fileEntry
+        raise ValueError(f"Archivo '{fileName}' no encontrado.")
+    
+    @registrarOperacion
+    def crearEntrada(self, fileName, content):
+        baseName = self.generarNombreBase(fileName)
         dataBlocks = self.crearDataBlocks(content, baseName)
+        self.liberarNombreBase(baseName)
         
         fileEntry = {
             "nombreArchivo": fileName,
             "archivoDatosInicial": dataBlocks[0] if dataBlocks else "",
             "enPapelera": False,
             "totalCaracteres": len(content),
+            "checksum": calcularChecksum(content),
             "fechaCreacion": datetime.datetime.now(),
             "fechaModificacion": datetime.datetime.now(),
             "fechaEliminacion": None,
@@ -79,8 +344,22 @@ class FatFileSystem:
             }
         }
         
-        self.fatTable.append(fileEntry)
-        self.guardarTablaFat()
+        with self.lock:
+            self.fatTable.append(fileEntry)
+            self.referencias[fileEntry["archivoDatosInicial"]] += 1
+            self.guardarTablaFat()
+        return fileEntry
+    
+    def crearArchivo(self):
+        fileName = input("Ingrese el nombre del archivo: ")
+        for fileEntry in self.fatTable:
+            if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
+                print("Error: Ya existe un archivo con ese nombre.")
+                return
+        
+        content = input("Ingrese el contenido del archivo: ")
+        
+        self.crearEntrada(fileName, content)
         print(f"Archivo '{fileName}' creado exitosamente.")
     
     def listarArchivos(self):
@@ -119,29 +398,54 @@ class FatFileSystem:
         if not filesFound:
             print("La papelera de reciclaje está vacía.")
     
-    def leerContenido(self, fileEntry):
-        if not fileEntry["archivoDatosInicial"]:
-            return ""
-        
-        content = ""
+    def recorrerBloques(self, fileEntry):
+        # Cualquier falla de integridad interrumpe la lectura en lugar de devolver contenido truncado
+        checksumArchivo = hashlib.sha256()
+        vistos = set()
         currentBlock = fileEntry["archivoDatosInicial"]
         
         while currentBlock:
+            if currentBlock in vistos:
+                raise ValueError(f"Ciclo detectado en el bloque {currentBlock}")
+            vistos.add(currentBlock)
+            
             try:
                 with open(currentBlock, 'r') as blockFile:
                     blockData = json.load(blockFile)
-                
-                content += blockData["datos"]
-                
-                if blockData["eof"]:
-                    break
-                
-                currentBlock = blockData["siguiente"]
+                datos, _ = leerDatosBloque(blockData)
+                eof = blockData["eof"]
+                nextBlock = blockData["siguiente"]
             except Exception as e:
-                print(f"Error al leer bloque {currentBlock}: {e}")
+                raise ValueError(f"Error al leer bloque {currentBlock}: {e}") from e
+            
+            if "checksum" in blockData and calcularChecksum(datos) != blockData["checksum"]:
+                raise ValueError(f"Checksum inválido en el bloque {currentBlock}")
+            
+            checksumArchivo.update(datos)
+            yield datos
+            
+            if eof:
                 break
+            if not nextBlock:
+                raise ValueError(f"El bloque {currentBlock} no tiene siguiente ni marca de fin")
+            
+            currentBlock = nextBlock
         
-        return content
+        if fileEntry.get("checksum") and checksumArchivo.hexdigest() != fileEntry["checksum"]:
+            raise ValueError(f"El contenido de '{fileEntry['nombreArchivo']}' no coincide con su checksum")
+    
+    def leerContenido(self, fileEntry):
+        content = b"".join(self.recorrerBloques(fileEntry))
+        return content if fileEntry.get("binario") else content.decode("utf-8")
+    
+    @registrarOperacion
+    def leerArchivo(self, fileName):
+        return self.leerContenido(self.buscarEntrada(fileName))
+    
+    def contenidoVisible(self, fileEntry):
+        if fileEntry.get("binario"):
+            return f"[Archivo binario de {fileEntry['totalCaracteres']} bytes, use la opción de exportar para obtenerlo]"
+        return self.leerArchivo(fileEntry["nombreArchivo"])
     
     def abrirArchivo(self):
         fileName = input("Ingrese el nombre del archivo a abrir: ")
@@ -158,7 +462,12 @@ class FatFileSystem:
                 print(f"Creado: {fileEntry['fechaCreacion']}")
                 print(f"Modificado: {fileEntry['fechaModificacion']}")
                 
-                content = self.leerContenido(fileEntry)
+                try:
+                    content = self.contenidoVisible(fileEntry)
+                except ValueError as e:
+                    print(f"Error: {e}")
+                    return
+                
                 print(f"\n--- CONTENIDO ---")
                 print(content)
                 return
@@ -186,45 +495,413 @@ class FatFileSystem:
     def modificarArchivo(self):
         fileName = input("Ingrese el nombre del archivo a modificar: ")
         
-        for i, fileEntry in enumerate(self.fatTable):
+        for fileEntry in self.fatTable:
             if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
                 if self.currentUser not in fileEntry["permisos"]["escritura"] and self.currentUser != fileEntry["owner"]:
                     print("Error: No tiene permisos de escritura para este archivo.")
                     return
                 
-                currentContent = self.leerContenido(fileEntry)
+                try:
+                    currentContent = self.contenidoVisible(fileEntry)
+                except ValueError as e:
+                    print(f"Error: {e}")
+                    return
+                
                 print(f"\n--- CONTENIDO ACTUAL ---")
                 print(currentContent)
                 
                 newContent = input("\nIngrese el nuevo contenido: ")
                 
+                self.reescribirEntrada(fileName, newContent)
+                print(f"Archivo '{fileName}' modificado exitosamente.")
+                return
+        
+        print("Error: Archivo no encontrado o está en la papelera.")
+    
+    @registrarOperacion
+    def reescribirEntrada(self, fileName, newContent):
+        # El conteo de referencias, el borrado y la actualizacion de la FAT van juntos para que
+        # un snapshot o clon concurrente no quede apuntando a una cadena borrada
+        with self.lock:
+            fileEntry = self.buscarEntrada(fileName)
+            
+            # Copy-on-write: si otro archivo o snapshot comparte la cadena, no se toca
+            if self.contarReferencias(fileEntry["archivoDatosInicial"]) <= 1:
                 self.borrarBloquesViejos(fileEntry["archivoDatosInicial"])
+            self.referencias[fileEntry["archivoDatosInicial"]] -= 1
+            
+            baseName = self.generarNombreBase(fileEntry["nombreArchivo"])
+            dataBlocks = self.crearDataBlocks(newContent, baseName)
+            self.liberarNombreBase(baseName)
+            
+            fileEntry["archivoDatosInicial"] = dataBlocks[0] if dataBlocks else ""
+            self.referencias[fileEntry["archivoDatosInicial"]] += 1
+            fileEntry["binario"] = False
+            fileEntry["totalCaracteres"] = len(newContent)
+            fileEntry["checksum"] = calcularChecksum(newContent)
+            fileEntry["fechaModificacion"] = datetime.datetime.now()
+            self.guardarTablaFat()
+        return fileEntry
+    
+    @registrarOperacion
+    def clonarEntrada(self, fileName, newName):
+        with self.lock:
+            newEntry = copy.deepcopy(self.buscarEntrada(fileName))
+        newEntry["nombreArchivo"] = newName
+        newEntry["fechaCreacion"] = datetime.datetime.now()
+        newEntry["fechaModificacion"] = datetime.datetime.now()
+        newEntry["owner"] = self.currentUser
+        newEntry["permisos"] = {
+            "lectura": [self.currentUser],
+            "escritura": [self.currentUser]
+        }
+        
+        with self.lock:
+            self.fatTable.append(newEntry)
+            self.referencias[newEntry["archivoDatosInicial"]] += 1
+            self.guardarTablaFat()
+        return newEntry
+    
+    def clonarArchivo(self):
+        fileName = input("Ingrese el nombre del archivo a clonar: ")
+        newName = input("Ingrese el nombre del nuevo archivo: ")
+        
+        for fileEntry in self.fatTable:
+            if fileEntry["nombreArchivo"] == newName and not fileEntry["enPapelera"]:
+                print("Error: Ya existe un archivo con ese nombre.")
+                return
+        
+        for fileEntry in self.fatTable:
+            if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
+                if self.currentUser not in fileEntry["permisos"]["lectura"] and self.currentUser != fileEntry["owner"]:
+                    print("Error: No tiene permisos de lectura para este archivo.")
+                    return
                 
-                baseName = fileName.replace(" ", "_").lower()
-                dataBlocks = self.crearDataBlocks(newContent, baseName)
+                self.clonarEntrada(fileName, newName)
+                print(f"Archivo '{fileName}' clonado como '{newName}'.")
+                return
+        
+        print("Error: Archivo no encontrado o está en la papelera.")
+    
+    def liberarCadenas(self, initialBlocks):
+        for initialBlock in initialBlocks:
+            if initialBlock and self.contarReferencias(initialBlock) == 0:
+                self.borrarBloquesViejos(initialBlock)
+    
+    @registrarOperacion
+    def crearSnapshot(self, nombre):
+        with self.lock:
+            if not nombre:
+                raise ValueError("El nombre del snapshot no puede estar vacío.")
+            if nombre in self.snapshots:
+                raise ValueError(f"Ya existe un snapshot llamado '{nombre}'.")
+            
+            snapshot = {
+                "nombre": nombre,
+                "fecha": datetime.datetime.now(),
+                "fatTable": copy.deepcopy(self.fatTable)
+            }
+            self.guardarSnapshot(snapshot)
+            self.snapshots[nombre] = snapshot
+            self.referencias.update(fileEntry["archivoDatosInicial"] for fileEntry in snapshot["fatTable"])
+    
+    @registrarOperacion
+    def restaurarSnapshot(self, nombre):
+        with self.lock:
+            cadenasActuales = {fileEntry["archivoDatosInicial"] for fileEntry in self.fatTable}
+            self.referencias.subtract(fileEntry["archivoDatosInicial"] for fileEntry in self.fatTable)
+            self.fatTable = copy.deepcopy(self.snapshots[nombre]["fatTable"])
+            self.referencias.update(fileEntry["archivoDatosInicial"] for fileEntry in self.fatTable)
+            self.guardarTablaFat()
+            self.liberarCadenas(cadenasActuales)
+    
+    @registrarOperacion
+    def eliminarSnapshot(self, nombre):
+        with self.lock:
+            snapshotFile = self.archivosSnapshot.get(nombre)
+            if snapshotFile and os.path.exists(snapshotFile):
+                os.remove(snapshotFile)
+            self.archivosSnapshot.pop(nombre, None)
+            snapshot = self.snapshots.pop(nombre)
+            self.referencias.subtract(fileEntry["archivoDatosInicial"] for fileEntry in snapshot["fatTable"])
+            self.liberarCadenas({fileEntry["archivoDatosInicial"] for fileEntry in snapshot["fatTable"]})
+    
+    def administrarSnapshots(self):
+        if self.currentUser != "admin":
+            print("Error: Solo el administrador puede gestionar snapshots.")
+            return
+        
+        print("\n1. Crear snapshot")
+        print("2. Listar snapshots")
+        print("3. Restaurar snapshot")
+        print("4. Eliminar snapshot")
+        
+        option = input("Seleccione una opción: ")
+        
+        if option == "1":
+            nombre = input("Ingrese el nombre del snapshot: ")
+            if nombre in self.snapshots:
+                print("Error: Ya existe un snapshot con ese nombre.")
+                return
+            try:
+                self.crearSnapshot(nombre)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+            print(f"Snapshot '{nombre}' creado exitosamente.")
+        elif option == "2":
+            print("\n--- SNAPSHOTS ---")
+            for snapshot in self.snapshots.values():
+                print(f"Nombre: {snapshot['nombre']}")
+                print(f"  Fecha: {snapshot['fecha']}")
+                print(f"  Archivos: {len(snapshot['fatTable'])}")
+                print("-" * 40)
+            if not self.snapshots:
+                print("No hay snapshots.")
+        elif option in ("3", "4"):
+            nombre = input("Ingrese el nombre del snapshot: ")
+            if nombre not in self.snapshots:
+                print("Error: Snapshot no encontrado.")
+                return
+            if option == "3":
+                self.restaurarSnapshot(nombre)
+                print(f"Snapshot '{nombre}' restaurado exitosamente.")
+            else:
+                self.eliminarSnapshot(nombre)
+                print(f"Snapshot '{nombre}' eliminado exitosamente.")
+        else:
+            print("Opción inválida.")
+    
+    @registrarOperacion
+    def importarArchivoHost(self, hostPath, fileName, progreso=imprimirProgreso):
+        return self.copiarArchivoHost(hostPath, fileName, progreso)
+    
+    def copiarArchivoHost(self, hostPath, fileName, progreso=imprimirProgreso, guardar=True):
+        with self.lock:
+            for fileEntry in self.fatTable:
+                if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
+                    raise ValueError(f"Ya existe un archivo llamado '{fileName}'.")
+        
+        total = os.path.getsize(hostPath)
+        baseName = self.generarNombreBase(fileName)
+        checksumArchivo = hashlib.sha256()
+        procesados = 0
+        index = 0
+        
+        # Se lee un bloque por adelantado para saber si el actual es el ultimo
+        try:
+            with open(hostPath, 'rb') as hostFile:
+                chunk = hostFile.read(self.tamanoBloqueImportacion)
+                while chunk:
+                    nextChunk = hostFile.read(self.tamanoBloqueImportacion)
+                    
+                    blockData = {
+                        "datos": base64.b64encode(chunk).decode("ascii"),
+                        "codificacion": "base64",
+                        "siguiente": self.generarBloque(baseName, index + 1) if nextChunk else "",
+                        "eof": not nextChunk,
+                        "checksum": calcularChecksum(chunk)
+                    }
+                    
+                    with open(self.generarBloque(baseName, index), 'w') as blockFile:
+                        json.dump(blockData, blockFile)
+                    
+                    checksumArchivo.update(chunk)
+                    procesados += len(chunk)
+                    index += 1
+                    if progreso:
+                        progreso(fileName, procesados, total)
+                    
+                    chunk = nextChunk
+        except Exception:
+            self.borrarBloquesViejos(self.generarBloque(baseName, 0))
+            raise
+        finally:
+            self.liberarNombreBase(baseName)
+        
+        if progreso and total == 0:
+            progreso(fileName, 0, 0)
+        
+        fileEntry = {
+            "nombreArchivo": fileName,
+            "archivoDatosInicial": self.generarBloque(baseName, 0) if index else "",
+            "enPapelera": False,
+            "binario": True,
+            "totalCaracteres": procesados,
+            "checksum": checksumArchivo.hexdigest(),
+            "fechaCreacion": datetime.datetime.now(),
+            "fechaModificacion": datetime.datetime.now(),
+            "fechaEliminacion": None,
+            "owner": self.currentUser,
+            "permisos": {
+                "lectura": [self.currentUser],
+                "escritura": [self.currentUser]
+            }
+        }
+        
+        with self.lock:
+            self.fatTable.append(fileEntry)
+            self.referencias[fileEntry["archivoDatosInicial"]] += 1
+            if guardar:
+                self.guardarTablaFat()
+        
+        return fileEntry
+    
+    @registrarOperacion
+    def exportarArchivoHost(self, fileName, hostPath, progreso=imprimirProgreso):
+        fileEntry = self.buscarEntrada(fileName)
+        procesados = 0
+        
+        if os.path.exists(hostPath) and not os.access(hostPath, os.W_OK):
+            raise PermissionError(f"No se puede escribir en '{hostPath}'.")
+        
+        # Se escribe en un temporal del mismo directorio y solo se reemplaza el destino si todo salio bien;
+        # recorrerBloques se detiene ante ciclos o bloques dañados sin tocar el archivo existente
+        tempFile = tempfile.NamedTemporaryFile(dir=os.path.dirname(hostPath) or ".", prefix=".exportando_", delete=False)
+        try:
+            with tempFile as hostFile:
+                for datos in self.recorrerBloques(fileEntry):
+                    hostFile.write(datos)
+                    procesados += len(datos)
+                    if progreso:
+                        progreso(fileEntry["nombreArchivo"], procesados, max(fileEntry["totalCaracteres"], procesados))
+            
+            if os.path.exists(hostPath):
+                os.chmod(tempFile.name, os.stat(hostPath).st_mode & 0o777)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tempFile.name, 0o666 & ~umask)
+            os.replace(tempFile.name, hostPath)
+        except BaseException:
+            if os.path.exists(tempFile.name):
+                os.remove(tempFile.name)
+            raise
+        
+        if progreso and procesados == 0:
+            progreso(fileEntry["nombreArchivo"], 0, 0)
+        
+        return procesados
+    
+    @registrarOperacion
+    def importarDirectorio(self, hostDirectory, hilos=None, progreso=None):
+        hostFiles = []
+        for root, _, files in os.walk(hostDirectory):
+            for name in sorted(files):
+                hostPath = os.path.join(root, name)
+                hostFiles.append((hostPath, Path(os.path.relpath(hostPath, hostDirectory)).as_posix()))
+        
+        importados = []
+        errores = []
+        
+        def importar(hostFile):
+            hostPath, fileName = hostFile
+            try:
+                self.copiarArchivoHost(hostPath, fileName, progreso=None, guardar=False)
+                return fileName, None
+            except Exception as e:
+                return fileName, str(e)
+        
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            for fileName, error in executor.map(importar, hostFiles):
+                if error:
+                    errores.append(f"{fileName}: {error}")
+                else:
+                    importados.append(fileName)
+                if progreso:
+                    progreso(hostDirectory, len(importados) + len(errores), len(hostFiles))
+        
+        self.guardarTablaFat()
+        
+        return importados, errores
+    
+    def importarArchivo(self):
+        hostPath = input("Ingrese la ruta del archivo a importar: ")
+        if not os.path.isfile(hostPath):
+            print("Error: El archivo no existe.")
+            return
+        
+        fileName = input("Ingrese el nombre del archivo en el sistema: ") or os.path.basename(hostPath)
+        
+        try:
+            self.importarArchivoHost(hostPath, fileName)
+        except Exception as e:
+            print(f"Error al importar el archivo: {e}")
+            return
+        
+        print(f"Archivo '{fileName}' importado exitosamente.")
+    
+    def exportarArchivo(self):
+        fileName = input("Ingrese el nombre del archivo a exportar: ")
+        
+        for fileEntry in self.fatTable:
+            if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
+                if self.currentUser not in fileEntry["permisos"]["lectura"] and self.currentUser != fileEntry["owner"]:
+                    print("Error: No tiene permisos de lectura para este archivo.")
+                    return
                 
-                self.fatTable[i]["archivoDatosInicial"] = dataBlocks[0] if dataBlocks else ""
-                self.fatTable[i]["totalCaracteres"] = len(newContent)
-                self.fatTable[i]["fechaModificacion"] = datetime.datetime.now()
+                hostPath = input("Ingrese la ruta de destino: ")
+                try:
+                    self.exportarArchivoHost(fileName, hostPath)
+                except Exception as e:
+                    print(f"Error al exportar el archivo: {e}")
+                    return
                 
-                self.guardarTablaFat()
-                print(f"Archivo '{fileName}' modificado exitosamente.")
+                print(f"Archivo '{fileName}' exportado a '{hostPath}'.")
                 return
         
         print("Error: Archivo no encontrado o está en la papelera.")
     
+    def importarCarpeta(self):
+        hostDirectory = input("Ingrese la ruta del directorio a importar: ")
+        if not os.path.isdir(hostDirectory):
+            print("Error: El directorio no existe.")
+            return
+        
+        importados, errores = self.importarDirectorio(hostDirectory, progreso=imprimirProgreso)
+        
+        print(f"Archivos importados: {len(importados)}")
+        for error in errores:
+            print(f"  Error: {error}")
+    
+    @registrarOperacion
+    def moverAPapelera(self, fileName):
+        with self.lock:
+            fileEntry = self.buscarEntrada(fileName)
+            fileEntry["enPapelera"] = True
+            fileEntry["fechaEliminacion"] = datetime.datetime.now()
+            self.guardarTablaFat()
+        return fileEntry
+    
+    @registrarOperacion
+    def sacarDePapelera(self, fileName):
+        with self.lock:
+            fileEntry = self.buscarEntrada(fileName, enPapelera=True)
+            fileEntry["enPapelera"] = False
+            fileEntry["fechaEliminacion"] = None
+            self.guardarTablaFat()
+        return fileEntry
+    
+    @registrarOperacion
+    def cambiarPermiso(self, fileName, userName, permiso, otorgar):
+        with self.lock:
+            usuarios = self.buscarEntrada(fileName)["permisos"][permiso]
+            if otorgar and userName not in usuarios:
+                usuarios.append(userName)
+            elif not otorgar and userName in usuarios:
+                usuarios.remove(userName)
+            self.guardarTablaFat()
+    
     def eliminarArchivo(self):
         fileName = input("Ingrese el nombre del archivo a eliminar: ")
         
-        for i, fileEntry in enumerate(self.fatTable):
+        for fileEntry in self.fatTable:
             if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
                 if self.currentUser != fileEntry["owner"]:
                     print("Error: Solo el propietario puede eliminar el archivo.")
                     return
                 
-                self.fatTable[i]["enPapelera"] = True
-                self.fatTable[i]["fechaEliminacion"] = datetime.datetime.now()
-                self.guardarTablaFat()
+                self.moverAPapelera(fileName)
                 print(f"Archivo '{fileName}' movido a la papelera de reciclaje.")
                 return
         
@@ -233,15 +910,13 @@ class FatFileSystem:
     def restaurarArchivo(self):
         fileName = input("Ingrese el nombre del archivo a recuperar: ")
         
-        for i, fileEntry in enumerate(self.fatTable):
+        for fileEntry in self.fatTable:
             if fileEntry["nombreArchivo"] == fileName and fileEntry["enPapelera"]:
                 if self.currentUser != fileEntry["owner"]:
                     print("Error: Solo el propietario puede recuperar el archivo.")
                     return
                 
-                self.fatTable[i]["enPapelera"] = False
-                self.fatTable[i]["fechaEliminacion"] = None
-                self.guardarTablaFat()
+                self.sacarDePapelera(fileName)
                 print(f"Archivo '{fileName}' recuperado de la papelera.")
                 return
         
@@ -255,7 +930,7 @@ class FatFileSystem:
         fileName = input("Ingrese el nombre del archivo: ")
         userName = input("Ingrese el nombre del usuario: ")
         
-        for i, fileEntry in enumerate(self.fatTable):
+        for fileEntry in self.fatTable:
             if fileEntry["nombreArchivo"] == fileName and not fileEntry["enPapelera"]:
                 print("\n1. Otorgar permiso de lectura")
                 print("2. Revocar permiso de lectura")
@@ -265,23 +940,130 @@ class FatFileSystem:
                 option = input("Seleccione una opción: ")
                 
                 if option == "1" and userName not in fileEntry["permisos"]["lectura"]:
-                    self.fatTable[i]["permisos"]["lectura"].append(userName)
+                    self.cambiarPermiso(fileName, userName, "lectura", True)
                 elif option == "2" and userName in fileEntry["permisos"]["lectura"]:
-                    self.fatTable[i]["permisos"]["lectura"].remove(userName)
+                    self.cambiarPermiso(fileName, userName, "lectura", False)
                 elif option == "3" and userName not in fileEntry["permisos"]["escritura"]:
-                    self.fatTable[i]["permisos"]["escritura"].append(userName)
+                    self.cambiarPermiso(fileName, userName, "escritura", True)
                 elif option == "4" and userName in fileEntry["permisos"]["escritura"]:
-                    self.fatTable[i]["permisos"]["escritura"].remove(userName)
+                    self.cambiarPermiso(fileName, userName, "escritura", False)
                 else:
                     print("Opción inválida o no aplicable.")
                     return
                 
-                self.guardarTablaFat()
                 print("Permisos actualizados exitosamente.")
                 return
         
         print("Error: Archivo no encontrado.")
     
+    @registrarOperacion
+    def verificarIntegridad(self, reparar=False, procesos=None):
+        # Las cadenas compartidas por clones y snapshots se revisan una sola vez
+        entradas = [(f"'{fileEntry['nombreArchivo']}'", fileEntry) for fileEntry in self.fatTable]
+        for snapshot in self.snapshots.values():
+            entradas += [(f"'{fileEntry['nombreArchivo']}' (snapshot {snapshot['nombre']})", fileEntry) for fileEntry in snapshot["fatTable"]]
+        
+        cadenas = sorted({fileEntry["archivoDatosInicial"] for _, fileEntry in entradas if fileEntry["archivoDatosInicial"]})
+        
+        resultados = {}
+        if cadenas:
+            procesos = procesos or os.cpu_count() or 1
+            chunkSize = max(1, len(cadenas) // (procesos * 4))
+            with ProcessPoolExecutor(max_workers=procesos) as executor:
+                resultados = dict(zip(cadenas, executor.map(verificarCadena, cadenas, chunksize=chunkSize)))
+        
+        errores = []
+        sinReparar = []
+        propietarioBloque = {}
+        
+        for inicio in cadenas:
+            for error in resultados[inicio]["errores"]:
+                errores.append(error)
+            for block in resultados[inicio]["bloquesDanados"]:
+                sinReparar.append(f"Bloque {block} con checksum inválido, se conserva en la cadena")
+            for block in resultados[inicio]["bloques"]:
+                if block in propietarioBloque:
+                    errores.append(f"Bloque {block} compartido por las cadenas {propietarioBloque[block]} y {inicio}")
+                    sinReparar.append(f"Bloque {block} compartido por las cadenas {propietarioBloque[block]} y {inicio}, se deja como está")
+                else:
+                    propietarioBloque[block] = inicio
+        
+        for etiqueta, fileEntry in entradas:
+            resultado = resultados.get(fileEntry["archivoDatosInicial"])
+            longitud = resultado["longitud"] if resultado else 0
+            checksum = resultado["checksum"] if resultado else calcularChecksum("")
+            
+            if fileEntry["totalCaracteres"] != longitud:
+                errores.append(f"{etiqueta}: totalCaracteres es {fileEntry['totalCaracteres']} pero la cadena tiene {longitud}")
+            elif fileEntry.get("checksum") and fileEntry["checksum"] != checksum:
+                errores.append(f"{etiqueta}: el checksum del archivo no coincide")
+        
+        huerfanos = []
+        with os.scandir(self.dataDirectory) as entries:
+            for entry in entries:
+                blockFileName = f"{self.dataDirectory}/{entry.name}"
+                if entry.name.endswith(".json") and blockFileName not in propietarioBloque:
+                    huerfanos.append(blockFileName)
+        
+        cuarentena = ""
+        if reparar:
+            for inicio in cadenas:
+                resultado = resultados[inicio]
+                if not resultado["cortada"]:
+                    continue
+                if resultado["bloques"]:
+                    ultimoBloque = resultado["bloques"][-1]
+                    with open(ultimoBloque, 'r') as blockFile:
+                        blockData = json.load(blockFile)
+                    blockData["siguiente"] = ""
+                    blockData["eof"] = True
+                    with open(ultimoBloque, 'w') as blockFile:
+                        json.dump(blockData, blockFile, indent=2)
+            
+            for etiqueta, fileEntry in entradas:
+                resultado = resultados.get(fileEntry["archivoDatosInicial"])
+                # Con bloques dañados el checksum calculado seria el de los datos corruptos, se conserva el original
+                if resultado and resultado["bloquesDanados"]:
+                    sinReparar.append(f"{etiqueta}: metadatos sin actualizar porque la cadena tiene bloques dañados")
+                    continue
+                if resultado and not resultado["bloques"]:
+                    fileEntry["archivoDatosInicial"] = ""
+                    resultado = None
+                fileEntry["totalCaracteres"] = resultado["longitud"] if resultado else 0
+                fileEntry["checksum"] = resultado["checksum"] if resultado else calcularChecksum("")
+            
+            # Los huerfanos se mueven a cuarentena en lugar de borrarse
+            if huerfanos:
+                cuarentena = os.path.join(self.quarantineDirectory, datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f"))
+                Path(cuarentena).mkdir(parents=True, exist_ok=True)
+            for blockFileName in huerfanos:
+                try:
+                    os.replace(blockFileName, os.path.join(cuarentena, os.path.basename(blockFileName)))
+                except Exception as e:
+                    sinReparar.append(f"No se pudo mover a cuarentena el bloque {blockFileName}: {e}")
+            
+            self.recalcularReferencias()
+            self.guardarTablaFat()
+            for snapshot in self.snapshots.values():
+                self.guardarSnapshot(snapshot)
+        
+        return {
+            "archivos": len(self.fatTable),
+            "bloques": len(propietarioBloque),
+            "errores": errores,
+            "huerfanos": huerfanos,
+            "sinReparar": sinReparar,
+            "cuarentena": cuarentena
+        }
+    
+    def verificarSistema(self):
+        option = input("¿Desea reparar los errores encontrados? (s/n): ")
+        reparar = option.lower() == "s"
+        reporte = self.verificarIntegridad(reparar=reparar)
+        
+        print("\n--- VERIFICACIÓN DE INTEGRIDAD ---")
+        print("\n".join(formatearReporte(reporte, reparar)))
+    
     def mostrarMenu(self):
         print("\n=== SISTEMA DE ARCHIVOS FAT ===")
         print("1. Crear archivo")
@@ -293,6 +1075,12 @@ class FatFileSystem:
         print("7. Recuperar archivo")
         print("8. Gestionar permisos")
         print("9. Cambiar usuario")
+        print("10. Verificar integridad")
+        print("11. Clonar archivo")
+        print("12. Gestionar snapshots")
+        print("13. Importar archivo")
+        print("14. Exportar archivo")
+        print("15. Importar directorio")
         print("0. Salir")
     
     def cambiarUsuario(self):
@@ -326,6 +1114,18 @@ class FatFileSystem:
                 self.administrarPermisos()
             elif option == "9":
                 self.cambiarUsuario()
+            elif option == "10":
+                self.verificarSistema()
+            elif option == "11":
+                self.clonarArchivo()
+            elif option == "12":
+                self.administrarSnapshots()
+            elif option == "13":
+                self.importarArchivo()
+            elif option == "14":
+                self.exportarArchivo()
+            elif option == "15":
+                self.importarCarpeta()
             elif option == "0":
                 print("¡Hasta luego!")
                 break
@@ -333,5 +1133,5 @@ class FatFileSystem:
                 print("Opción inválida. Intente nuevamente.")
 
 if __name__ == "__main__":
-    fileSystem = FatFileSystem()
+    fileSystem = FatFileSystem(archivoGrabacion=os.environ.get("FAT_GRABACION"))
     fileSystem.run()
\ No newline at end of file
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from logica import FatFileSystem, operacionesRegistrables
+
+def cargarTraza(rutaTraza):
+    traza = []
+    with open(rutaTraza, 'r', encoding="utf-8") as file:
+        for linea in file:
+            if not linea.strip():
+                continue
+            registro = json.loads(linea)
+            # Se ignoran las lineas que no vienen del grabador
+            if registro.get("operacion") in operacionesRegistrables:
+                traza.append(registro)
+    return sorted(traza, key=lambda registro: registro["timestamp"])
+
+def interpretarModo(texto):
+    # Formato: nombre:atributo=valor,atributo=valor
+    nombre, _, asignaciones = texto.partition(":")
+    atributos = {}
+    for asignacion in filter(None, asignaciones.split(",")):
+        atributo, _, valor = asignacion.partition("=")
+        try:
+            atributos[atributo] = json.loads(valor)
+        except json.JSONDecodeError:
+            atributos[atributo] = valor
+    return nombre, atributos
+
+# Operaciones que afectan a todo el volumen: se ejecutan solas, despues de todo lo anterior y antes de todo lo siguiente
+operacionesBarrera = {"crearSnapshot", "restaurarSnapshot", "eliminarSnapshot", "importarDirectorio", "verificarIntegridad"}
+
+def dividirEnTramos(traza):
+    tramos = [[]]
+    nombres = set()
+    for index, registro in enumerate(traza):
+        argumentos = registro["argumentos"]
+        # Un clon sobre un nombre ya usado en el tramo uniria dos colas distintas, asi que tambien corta el tramo
+        if registro["operacion"] in operacionesBarrera or argumentos.get("newName") in nombres:
+            tramos.append([(index, registro)])
+            tramos.append([])
+            nombres = set()
+        else:
+            tramos[-1].append((index, registro))
+            nombres.update(argumentos[clave] for clave in ("fileName", "newName") if clave in argumentos)
+    return [tramo for tramo in tramos if tramo]
+
+def asignarColas(tramo, hilos):
+    # Las operaciones sobre un mismo archivo (y sus clones) van al mismo hilo para conservar su orden
+    colas = [[] for _ in range(max(1, hilos))]
+    colaArchivo = {}
+
+    for index, registro in tramo:
+        argumentos = registro["argumentos"]
+        cola = colaArchivo.setdefault(argumentos.get("fileName", ""), len(colaArchivo) % len(colas))
+        if "newName" in argumentos:
+            colaArchivo[argumentos["newName"]] = cola
+        colas[cola].append((index, registro))
+
+    return [cola for cola in colas if cola]
+
+def reproducir(traza, aceleracion=0, hilos=1, atributos=None):
+    resultados = []
+    resultadosLock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as directorioBase:
+        fileSystem = FatFileSystem(directorioBase=directorioBase)
+        for atributo, valor in (atributos or {}).items():
+            setattr(fileSystem, atributo, valor)
+
+        exportDirectory = os.path.join(directorioBase, "exportados")
+        os.makedirs(exportDirectory)
+
+        inicioTraza = traza[0]["timestamp"] if traza else 0
+        inicioReproduccion = time.perf_counter()
+
+        def ejecutar(cola):
+            for index, registro in cola:
+                if aceleracion:
+                    espera = (registro["timestamp"] - inicioTraza) / aceleracion - (time.perf_counter() - inicioReproduccion)
+                    if espera > 0:
+                        time.sleep(espera)
+
+                argumentos = dict(registro["argumentos"])
+                if registro["operacion"] == "exportarArchivoHost":
+                    argumentos["hostPath"] = os.path.join(exportDirectory, f"{index}_{os.path.basename(argumentos['hostPath'])}")
+                if registro["operacion"] in ("importarArchivoHost", "exportarArchivoHost"):
+                    argumentos["progreso"] = None
+
+                fileSystem.asignarUsuarioHilo(registro["usuario"])
+                error = None
+                inicio = time.perf_counter()
+                try:
+                    getattr(fileSystem, registro["operacion"])(**argumentos)
+                except Exception as e:
+                    error = str(e)
+                duracion = time.perf_counter() - inicio
+
+                with resultadosLock:
+                    resultados.append({
+                        "indice": index,
+                        "operacion": registro["operacion"],
+                        "duracionOriginal": registro.get("duracion"),
+                        "duracion": duracion,
+                        "error": error
+                    })
+
+        for tramo in dividirEnTramos(traza):
+            colas = asignarColas(tramo, hilos)
+            threads = [threading.Thread(target=ejecutar, args=(cola,)) for cola in colas]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        tiempoTotal = time.perf_counter() - inicioReproduccion
+
+    return sorted(resultados, key=lambda resultado: resultado["indice"]), tiempoTotal
+
+def percentil(valores, porcentaje):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * porcentaje / 100))]
+
+def resumirLatencias(resultados, campo):
+    # Las operaciones con error no entran en las latencias, pero se cuentan para que no pasen desapercibidas
+    latencias = {}
+    errores = {}
+    for resultado in resultados:
+        if resultado["error"]:
+            errores[resultado["operacion"]] = errores.get(resultado["operacion"], 0) + 1
+        elif resultado[campo] is not None:
+            latencias.setdefault(resultado["operacion"], []).append(resultado[campo])
+    return {
+        operacion: {
+            "cantidad": len(latencias.get(operacion, [])),
+            "errores": errores.get(operacion, 0),
+            "media": sum(latencias[operacion]) / len(latencias[operacion]) if operacion in latencias else None,
+            "p95": percentil(latencias.get(operacion, []), 95)
+        }
+        for operacion in set(latencias) | set(errores)
+    }
+
+def imprimirComparacion(nombreBase, resumenBase, nombreModo, resumenModo):
+    print(f"\n--- {nombreModo} contra {nombreBase} ---")
+    print(f"{'Operación':<22}{'Cant.':>7}{'Err.':>6}{'Media base (ms)':>18}{'Media (ms)':>13}{'Delta':>10}{'p95 (ms)':>11}")
+    for operacion in sorted(set(resumenBase) | set(resumenModo)):
+        base = resumenBase.get(operacion)
+        modo = resumenModo.get(operacion)
+        errores = modo["errores"] if modo else 0
+        if not base or not modo or base["media"] is None or modo["media"] is None:
+            print(f"{operacion:<22}{modo['cantidad'] if modo else 0:>7}{errores:>6}{'sin datos para comparar':>52}")
+            continue
+        delta = (modo["media"] - base["media"]) / base["media"] * 100 if base["media"] else 0.0
+        print(f"{operacion:<22}{modo['cantidad']:>7}{errores:>6}{base['media'] * 1000:>18.3f}{modo['media'] * 1000:>13.3f}{delta:>+9.1f}%{modo['p95'] * 1000:>11.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce una traza grabada sobre un volumen nuevo")
+    parser.add_argument("traza", help="archivo JSON Lines generado con FAT_GRABACION")
+    parser.add_argument("--aceleracion", type=float, default=0, help="factor de aceleración respecto a la traza (0 = sin esperas)")
+    parser.add_argument("--hilos", type=int, default=1, help="cantidad de hilos de reproducción")
+    parser.add_argument("--modo", action="append", default=[], help="configuración a comparar, por ejemplo grande:tamanoBloqueImportacion=1048576")
+    args = parser.parse_args()
+
+    traza = cargarTraza(args.traza)
+    print(f"Operaciones en la traza: {len(traza)}")
+
+    modos = [interpretarModo(modo) for modo in args.modo] or [("reproduccion", {})]
+    resumenes = []
+
+    for nombre, atributos in modos:
+        resultados, tiempoTotal = reproducir(traza, args.aceleracion, args.hilos, atributos)
+        errores = [resultado for resultado in resultados if resultado["error"]]
+        print(f"\nModo '{nombre}': {len(resultados)} operaciones en {tiempoTotal:.3f} s, {len(errores)} con error")
+        for resultado in errores[:10]:
+            print(f"  #{resultado['indice']} {resultado['operacion']}: {resultado['error']}")
+        resumenes.append((nombre, resumirLatencias(resultados, "duracion")))
+        if len(modos) == 1:
+            resumenes.insert(0, ("grabación", resumirLatencias(resultados, "duracionOriginal")))
+
+    nombreBase, resumenBase = resumenes[0]
+    for nombre, resumen in resumenes[1:]:
+        imprimirComparacion(nombreBase, resumenBase, nombre, resumen)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import argparse
+from logica import FatFileSystem, formatearReporte
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica la integridad del sistema de archivos FAT")
+    parser.add_argument("--reparar", action="store_true", help="corrige los errores encontrados")
+    parser.add_argument("--procesos", type=int, default=None, help="cantidad de procesos a utilizar")
+    args = parser.parse_args()
+
+    fileSystem = FatFileSystem()
+    reporte = fileSystem.verificarIntegridad(reparar=args.reparar, procesos=args.procesos)
+
+    print("\n".join(formatearReporte(reporte, args.reparar)))
+    return 0 if not reporte["errores"] and not reporte["huerfanos"] else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())